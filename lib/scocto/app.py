@@ -42,56 +42,174 @@ class MyEvent:
         # Dict of all picks referenced by this event
         self.picks = dict()
 
+        # Set of the IDs of these picks for fast overlap counting
+        self.pick_ids = set()
+
         # The currently preferred origin; usually self.origins[-1]
         self.preferredOrigin = None
 
         self.lastPublished = False
 
     def set_origin(self, origin, picks):
-        method = origin.methodID()
-        if method not in self.origins:
-            self.origins[method] = list()
-        self.origins[method].append(origin)
-        for i in range(origin.arrivalCount()):
-            arr = origin.arrival(i)
-            self.picks[arr.pickID()] = picks[arr.pickID()]
+        self.origins.setdefault(origin.methodID(), list()).append(origin)
+        pick_ids = scocto.util.originPickIDs(origin)
+        for pick_id in pick_ids:
+            self.picks[pick_id] = picks[pick_id]
+        self.pick_ids.update(pick_ids)
+
+
+class LastOriginTable:
+    # Latitude, longitude, depth and time of the last origin of one
+    # method for each event, kept as parallel arrays so that a new
+    # origin can be compared against all events in one vectorized step.
+    # The arrays grow by doubling; only the first self.count rows are
+    # in use.
+    def __init__(self, capacity=64):
+        self.events = list()
+        self.rows = dict()
+        self.count = 0
+        self.lat = numpy.empty(capacity)
+        self.lon = numpy.empty(capacity)
+        self.dep = numpy.empty(capacity)
+        self.time = numpy.empty(capacity)
+
+    def grow(self):
+        capacity = 2*len(self.lat)
+        for name in ("lat", "lon", "dep", "time"):
+            array = numpy.empty(capacity)
+            array[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, array)
+
+    def update(self, event, origin):
+        row = self.rows.get(event)
+        if row is None:
+            if self.count == len(self.lat):
+                self.grow()
+            row = self.rows[event] = self.count
+            self.events.append(event)
+            self.count += 1
+        self.lat[row], self.lon[row], self.dep[row], self.time[row] = \
+            scocto.util.originCoordinates(origin)
+
+
+class MyEventList:
+    # The events in the order of their creation plus, per method ID,
+    # a LastOriginTable for the vectorized matching of new origins.
 
+    def __init__(self):
+        self.events = list()
+        self.last_origins = dict()
 
-class MyEventList(list):
+    def __len__(self):
+        return len(self.events)
 
-    def find_matching_event(self, origin):
+    def __iter__(self):
+        return iter(self.events)
 
-        method = origin.methodID()
+    def append_event(self, event):
+        self.events.append(event)
 
-        pick_ids = list()
-        for i in range(origin.arrivalCount()):
-            arr = origin.arrival(i)
-            pick_ids.append(arr.pickID())
+    def set_origin(self, event, origin, picks):
+        event.set_origin(origin, picks)
+        method = origin.methodID()
+        if method not in self.last_origins:
+            self.last_origins[method] = LastOriginTable()
+        self.last_origins[method].update(event, origin)
 
-        matching_events = list()
-        for event in self:
-            if method not in event.origins:
-                continue
+    def find_matching_event(self, origin):
 
-            last = event.origins[method][-1]
-            if scocto.util.originTimeSeparation(last, origin) < 30 and \
-               scocto.util.originDistanceKm(last, origin) < 100:
+        method = origin.methodID()
+        table = self.last_origins.get(method)
+        if table is None:
+            return
 
-                common_pick_count = 0
+        pick_ids = scocto.util.originPickIDs(origin)
+
+        lat, lon, dep, tim = scocto.util.originCoordinates(origin)
+
+        # Cheap pre-selection by time and latitude difference, the latter
+        # being a lower bound of the distance, so that the distances
+        # only need to be computed for the few remaining events. The
+        # latitude limit uses the same earth radius as haversineKm().
+        max_dist_km = 100
+        max_dlat = numpy.degrees(max_dist_km / scocto.util.earth_radius_km)
+        n = table.count
+        rows = numpy.flatnonzero(
+            (numpy.abs(table.time[:n] - tim) < 30) &
+            (numpy.abs(table.lat[:n] - lat) < max_dlat))
+        delta_km = scocto.util.haversineKm(
+            lat, lon, table.lat[rows], table.lon[rows])
+        dist_km = numpy.hypot(delta_km, table.dep[rows] - dep)
+        candidates = rows[dist_km < max_dist_km]
+
+        # Keep the first event with the largest number of common picks.
+        # No event can have more than all picks of the origin in common,
+        # so we can stop as soon as we found one that does.
+        matching_event = None
+        best_count = 0
+        for row in candidates:
+            event = table.events[row]
+            if pick_ids.isdisjoint(event.pick_ids):
+                continue
+            common_pick_count = len(pick_ids & event.pick_ids)
+            if common_pick_count > best_count:
+                matching_event, best_count = event, common_pick_count
+                if best_count == len(pick_ids):
+                    break
+
+        if matching_event is not None:
+            seiscomp.logging.debug("Common pick count: %d" % best_count)
+            return matching_event
 
-                for pick_id in pick_ids:
-                    if pick_id in event.picks:
-                        common_pick_count += 1
 
-                if common_pick_count:
-                    matching_events.append( (common_pick_count, event) )
+class PickBuffer:
+    # Picks sorted by pick time, together with their "net.sta.loc"
+    # station codes and, as float array, their pick times, so that the
+    # picks within a time window are found by binary search.
+    def __init__(self, capacity=1024):
+        self.picks = list()
+        self.stations = list()
+        self.times = numpy.empty(capacity)
+
+    def __len__(self):
+        return len(self.picks)
+
+    def insert(self, pick):
+        t = scocto.util.pickEpoch(pick)
+        count = len(self.picks)
+        if count == len(self.times):
+            times = numpy.empty(2*count)
+            times[:count] = self.times
+            self.times = times
+        i = int(numpy.searchsorted(self.times[:count], t, side="right"))
+        self.times[i+1:count+1] = self.times[i:count]
+        self.times[i] = t
+        n, s, l, c = scocto.util.nslc(pick)
+        self.stations.insert(i, "%s.%s.%s" % (n, s, l))
+        self.picks.insert(i, pick)
+
+    def window(self, tmin, tmax):
+        """
+        Return the index range lo, hi of the picks with
+        tmin < pick time < tmax
+        """
+        times = self.times[:len(self.picks)]
+        lo = int(numpy.searchsorted(times, tmin, side="right"))
+        hi = int(numpy.searchsorted(times, tmax, side="left"))
+        return lo, hi
 
-        if matching_events:
-            common_pick_count, matching_event = sorted(matching_events)[-1]
-            seiscomp.logging.debug("Number of matching events: %d" % (len(matching_events)))
-            for common_pick_count, event in matching_events:
-                seiscomp.logging.debug("Common pick count: %d" % common_pick_count)
-            return matching_event
+    def removeOlderThan(self, tmin):
+        """
+        Remove all picks with pick time < tmin and return them as list
+        """
+        count = len(self.picks)
+        n = int(numpy.searchsorted(self.times[:count], tmin, side="left"))
+        removed = self.picks[:n]
+        if n:
+            self.times[:count-n] = self.times[n:count]
+            del self.picks[:n]
+            del self.stations[:n]
+        return removed
 
 
 class App(seiscomp.client.Application):
@@ -102,7 +220,7 @@ class App(seiscomp.client.Application):
         self.setLoadInventoryEnabled(True)
 
         self.picks = dict()
-        self.sortedPicks = list()
+        self.pickBuffer = PickBuffer()
 
         self.inventoryXML = None
         self.modelCSV = None
@@ -131,15 +249,37 @@ class App(seiscomp.client.Application):
         self.targetMessagingGroup = "LOCATION"
 
         self.pickAuthors = None
+        self.pickAuthorWhitelist = None
 
         self.pickQueue = list()
         self.pickDelay = 0
         self.pickDelay = 180
 
+        # Due picks with pick times up to this many seconds apart are
+        # processed together in one associator run, see pickBatches().
+        # Configurable as scoctoloc.pickBatchSpan.
+        self.pickBatchSpan = 1.
+
+        # In online mode, picks older than this many seconds are dropped.
+        # This is a lower limit, see cleanup().
+        self.maxPickAge = 1800.
+
         self.debug_data_dir = None
+        self.debug_dump_interval = 1
+
+        # Whether debug log output is wanted at all. Used to skip the
+        # preparation of debug output that would be discarded anyway.
+        self.debugEnabled = False
 
         self.event_list = MyEventList()
 
+        # Container used to generate the notifier messages for new
+        # origins. It is reused and emptied again after each message.
+        self.outputEP = seiscomp.datamodel.EventParameters()
+
+        # New origins waiting to be published by publishOrigins()
+        self.pendingOrigins = list()
+
         self.playbackTime = None
 
     def createCommandLineDescription(self):
@@ -161,6 +301,7 @@ class App(seiscomp.client.Application):
         self.commandline().addStringOption("Config", "locator", "specify locator (default is LOCSAT)")
         self.commandline().addOption("Config", "test", "test mode - no results are sent to messaging")
         self.commandline().addOption("Config", "debug-data-dir", "specify folder to dump input for debugging in PyOcto (off by default)")
+        self.commandline().addIntOption("Config", "debug-data-interval", "with --debug-data-dir, dump the picks of only every n-th associator run (default 1)")
 
         self.commandline().addGroup("Mode")
         self.commandline().addOption("Mode", "playback", "run in playback mode")
@@ -176,24 +317,45 @@ class App(seiscomp.client.Application):
         if not super().initConfiguration():
             return False
 
-        # Input config
-
         try:
-            self.messagingGroup = self.configGetString("scoctoloc.messagingGroup")
+            self.debugEnabled = self.configGetInt("logging.level") >= 4
         except RuntimeError:
             pass
 
-        try:
-            self.targetMessagingGroup = self.configGetString("scoctoloc.targetMessagingGroup")
-        except RuntimeError:
-            pass
-
-        try:
-            self.pickAuthors = self.configGetStrings("scoctoloc.pickAuthors")
-        except RuntimeError:
-            pass
+        # Model files are only used if configured
+        self.modelCSV = None
+        self.modelConst = None
 
-        # Associator config
+        # (attribute, configuration parameter, getter)
+        parameters = [
+            # Input config
+            ("messagingGroup", "scoctoloc.messagingGroup", self.configGetString),
+            ("targetMessagingGroup", "scoctoloc.targetMessagingGroup", self.configGetString),
+            ("pickAuthors", "scoctoloc.pickAuthors", self.configGetStrings),
+            # Associator config
+            ("minDepth", "scoctoloc.minDepth", self.configGetDouble),
+            ("maxDepth", "scoctoloc.maxDepth", self.configGetDouble),
+            ("maxDistance", "scoctoloc.network.radius", self.configGetDouble),
+            ("modelCSV", "scoctoloc.octo.model.csv", self.configGetString),
+            # Constant-velocity, single layer
+            ("modelConst", "scoctoloc.octo.model.const", self.configGetString),
+            ("min_num_p_picks", "scoctoloc.minPickCountP", self.configGetInt),
+            ("min_num_s_picks", "scoctoloc.minPickCountS", self.configGetInt),
+            ("min_num_p_and_s_picks", "scoctoloc.minPickCountPAndS", self.configGetInt),
+            ("min_num_p_or_s_picks", "scoctoloc.minPickCountPOrS", self.configGetInt),
+            ("pickDelay", "scoctoloc.pickDelay", self.configGetDouble),
+            ("pickBatchSpan", "scoctoloc.pickBatchSpan", self.configGetDouble),
+            # Locator config
+            ("locatorName", "scoctoloc.locator", self.configGetString),
+            # Output config
+            ("output_schedule", "scoctoloc.outputSchedule", self.configGetStrings),
+        ]
+
+        for attr, name, get in parameters:
+            try:
+                setattr(self, attr, get(name))
+            except RuntimeError:
+                pass
 
         try:
             center = self.configGetStrings("scoctoloc.network.center")
@@ -202,73 +364,19 @@ class App(seiscomp.client.Application):
         except RuntimeError:
             pass
 
-        try:
-            self.minDepth = self.configGetDouble("scoctoloc.minDepth")
-        except RuntimeError:
-            pass
-
-        try:
-            self.maxDepth = self.configGetDouble("scoctoloc.maxDepth")
-        except RuntimeError:
-            pass
-
-        try:
-            self.maxDistance = self.configGetDouble("scoctoloc.network.radius")
-        except RuntimeError:
-            pass
-
-        try:
-            self.modelCSV = self.configGetString("scoctoloc.octo.model.csv")
-        except RuntimeError:
-            self.modelCSV = None
-
-        try:
-            # Constant-velocity, single layer
-            self.modelConst = self.configGetString("scoctoloc.octo.model.const")
-        except RuntimeError:
-            self.modelConst = None
-
-        try:
-            self.min_num_p_picks = self.configGetInt("scoctoloc.minPickCountP")
-        except RuntimeError:
-            pass
-
-        try:
-            self.min_num_s_picks = self.configGetInt("scoctoloc.minPickCountS")
-        except RuntimeError:
-            pass
-
-        try:
-            self.min_num_p_and_s_picks = self.configGetInt("scoctoloc.minPickCountPAndS")
-        except RuntimeError:
-            pass
-
-        try:
-            self.min_num_p_or_s_picks = self.configGetInt("scoctoloc.minPickCountPOrS")
-        except RuntimeError:
-            pass
-
-        try:
-            self.pickDelay = self.configGetDouble("scoctoloc.pickDelay")
-        except RuntimeError:
-            pass
-
-        # Locator config
-
-        try:
-            self.locatorName = self.configGetString("scoctoloc.locator")
-        except RuntimeError:
-            pass
-
-        # Output config
-
-        try:
-            self.output_schedule = self.configGetStrings("scoctoloc.outputSchedule")
-        except RuntimeError:
-            pass
-
         return True
 
+    def getOption(self, name, default=None, get=None):
+        """
+        Return the value of a command-line option, read by default as
+        string, or the default if the option was not specified.
+        """
+        if not self.commandline().hasOption(name):
+            return default
+        if get is None:
+            get = self.commandline().optionString
+        return get(name)
+
     def validateParameters(self):
         if super().validateParameters() is False:
             return False
@@ -283,6 +391,24 @@ class App(seiscomp.client.Application):
             else:
                 self.setMessagingEnabled(True)
 
+        # Debug output is only prepared if it may actually be logged.
+        # Only --quiet, --debug and --verbosity tell the level for sure.
+        # With -v flags the effective level is up to SeisComP, so in that
+        # case debug output is prepared to be on the safe side.
+        if self.commandline().hasOption("quiet"):
+            self.debugEnabled = False
+        elif self.commandline().hasOption("debug") or \
+                self.commandline().hasOption("v"):
+            self.debugEnabled = True
+        elif self.commandline().hasOption("verbosity"):
+            try:
+                self.debugEnabled = self.commandline().optionInt("verbosity") >= 4
+            except RuntimeError:
+                pass
+
+        if self.commandline().hasOption("test"):
+            self.test = True
+
         if self.commandline().hasOption("playback"):
             self.processingMode = "playback"
         else:
@@ -293,85 +419,39 @@ class App(seiscomp.client.Application):
         else:
             pass
 
-        try:
-            self.locatorName = self.commandline().optionString("locator")
-        except RuntimeError:
-            pass
+        self.locatorName = self.getOption("locator", self.locatorName)
+        self.inputXML = self.getOption("input-xml")
+        self.inventoryXML = self.getOption("inventory-xml")
+        self.outputXML = self.getOption("output-xml", "-")
+        self.modelCSV = self.getOption("model-csv", self.modelCSV)
+        # Constant-velocity, single layer
+        self.modelConst = self.getOption("model-const", self.modelConst)
 
-        try:
-            self.inputXML = self.commandline().optionString("input-xml")
-        except RuntimeError:
-            self.inputXML = None
-
-        try:
-            self.inventoryXML = self.commandline().optionString("inventory-xml")
-        except RuntimeError:
-            self.inventoryXML = None
-
-        try:
-            self.outputXML = self.commandline().optionString("output-xml")
-        except RuntimeError:
-            self.outputXML = "-"
-
-        try:
-            self.modelCSV = self.commandline().optionString("model-csv")
-        except RuntimeError:
-            pass
-
-        try:
-            # Constant-velocity, single layer
-            self.modelConst = self.commandline().optionString("model-const")
-        except RuntimeError:
-            pass
-
-        try:
-            tmp = self.commandline().optionString("center-latlon")
-            self.centerLatLon = tuple(map(float, tmp.split(",")))
-        except RuntimeError:
-            self.centerLatLon = None
-
-        try:
-            self.minDepth = self.commandline().optionDouble("min-depth")
-        except RuntimeError:
-            pass
-
-        try:
-            self.maxDepth = self.commandline().optionDouble("max-depth")
-        except RuntimeError:
-            pass
+        center = self.getOption("center-latlon")
+        self.centerLatLon = tuple(map(float, center.split(","))) if center else None
 
-        try:
-            self.maxDistance = self.commandline().optionDouble("max-distance")
-        except RuntimeError:
-            pass
+        optionDouble = self.commandline().optionDouble
+        self.minDepth = self.getOption("min-depth", self.minDepth, optionDouble)
+        self.maxDepth = self.getOption("max-depth", self.maxDepth, optionDouble)
+        self.maxDistance = self.getOption("max-distance", self.maxDistance, optionDouble)
 
         if self.commandline().hasOption("use-pick-time"):
             self.use_pick_time = True
 
-        try:
-            tmp = self.commandline().optionString("pick-delay")
-            self.pickDelay = float(tmp)
-        except RuntimeError:
-            pass
-
-        try:
-            self.pickAuthors = self.commandline().optionString("pick-authors").replace(",", " ").split()
-        except RuntimeError:
-            pass
+        self.pickDelay = self.getOption("pick-delay", self.pickDelay, optionDouble)
 
-        try:
-            self.output_schedule = self.commandline().optionString("output-schedule").replace(",", " ").split()
-        except RuntimeError:
-            self.output_schedule = []
+        pickAuthors = self.getOption("pick-authors")
+        if pickAuthors is not None:
+            self.pickAuthors = pickAuthors.replace(",", " ").split()
 
-        try:
-            startTime = self.commandline().optionString("start-time")
-            endTime = self.commandline().optionString("end-time")
+        schedule = self.getOption("output-schedule", "")
+        self.output_schedule = schedule.replace(",", " ").split()
 
+        startTime = self.getOption("start-time")
+        endTime = self.getOption("end-time")
+        if startTime is not None and endTime is not None:
             self.startTime = scocto.util.parseTime(startTime)
             self.endTime   = scocto.util.parseTime(endTime)
-        except RuntimeError:
-            pass
 
         if self.commandline().hasOption("pyocto-locations"):
             self.want_raw_pyocto_locations = True
@@ -383,6 +463,12 @@ class App(seiscomp.client.Application):
             self.debug_data_dir = self.commandline().optionString("debug-data-dir")
         except RuntimeError:
             pass
+        self.debug_dump_interval = self.getOption(
+            "debug-data-interval", self.debug_dump_interval,
+            self.commandline().optionInt)
+        if self.debug_dump_interval < 1:
+            seiscomp.logging.error("debug-data-interval must be at least 1")
+            return False
 
         self.output_schedule = [float(t) for t in self.output_schedule]
 
@@ -444,6 +530,13 @@ class App(seiscomp.client.Application):
         else:
             self.whitelist = None
 
+    def setupPickAuthorWhitelist(self):
+        if self.pickAuthors:
+            self.pickAuthorWhitelist = \
+                scocto.whitelist.AuthorWhitelist(self.pickAuthors)
+        else:
+            self.pickAuthorWhitelist = None
+
     def setupAssociators(self):
         centerLat, centerLon = self.centerLatLon
 
@@ -458,7 +551,9 @@ class App(seiscomp.client.Application):
                 min_num_p_and_s_picks=self.min_num_p_and_s_picks,
                 min_num_p_or_s_picks=self.min_num_p_or_s_picks,
                 velocity_model=self.velocityModel,
-                debug_data_dir=self.debug_data_dir)
+                debug_data_dir=self.debug_data_dir,
+                debug_dump_interval=self.debug_dump_interval)
+        associator.debug_enabled = self.debugEnabled
         associator.setInventory(self.inventory)
         associator.setPickAuthors(self.pickAuthors)
         self.associator = associator
@@ -477,21 +572,9 @@ class App(seiscomp.client.Application):
         assert self.locatorInterface is not None
         loc = self.locatorInterface
 
-        def deepCloneOrigin(origin):
-            cloned = seiscomp.datamodel.Origin.Cast(origin.clone())
-            for iarr in range(origin.arrivalCount()):
-                arr = seiscomp.datamodel.Arrival.Cast(origin.arrival(iarr).clone())
-                cloned.add(arr)
-            return cloned
-
-        origin = deepCloneOrigin(origin)
-
-        seiscomp.logging.debug("Before arrival loop")
-        for iarr in range(origin.arrivalCount()):
-            arr = origin.arrival(iarr)
-            arr.setWeight(1)
-            arr.setTimeUsed(True)
-        seiscomp.logging.debug("After  arrival loop")
+        # The locator doesn't modify the input origin, so there is no
+        # need to clone it. Its arrivals are already all used with full
+        # weight, see scocto.octo.convertOriginFromPyocto().
 
         while True:
             if fixedDepth is None:
@@ -512,53 +595,45 @@ class App(seiscomp.client.Application):
                 relocated = None
                 seiscomp.logging.debug("Relocation failed")
 
-            if relocated:
-                try:
-                    quality = relocated.originQuality()
-                except:
-                    quality = seiscomp.datamodel.OriginQuality()
-
-                if fixedDepth is None:
-                    relocated.setDepthType(seiscomp.datamodel.FROM_LOCATION)
-                else:
-                    relocated.setDepthType(seiscomp.datamodel.OPERATOR_ASSIGNED)
-
-                if relocated.depth().value() < self.minDepth and fixedDepth is None:
-                    # Fix depth to minimum depth and relocate again
-                    fixedDepth = self.minDepth
-                    continue
+            if relocated and fixedDepth is None and \
+                    relocated.depth().value() < self.minDepth:
+                # Fix depth to minimum depth and relocate again
+                fixedDepth = self.minDepth
+                continue
 
             break
 
         if relocated:
+            if fixedDepth is None:
+                relocated.setDepthType(seiscomp.datamodel.FROM_LOCATION)
+            else:
+                relocated.setDepthType(seiscomp.datamodel.OPERATOR_ASSIGNED)
+
             try:
                 quality = relocated.originQuality()
             except:
                 quality = seiscomp.datamodel.OriginQuality()
 
-            residuals = []
-            distances = []
-            associatedPhaseCount = 0
+            # The arrivals of the relocated origin won't change anymore,
+            # so the snapshot is shared with the azimuthal gap computation
+            arrivals = scocto.util.originArrivals(relocated)
+            n = len(arrivals)
+            residuals = numpy.empty(n)
+            distances = numpy.empty(n)
             usedPhaseCount = 0
-            for i in range(relocated.arrivalCount()):
-                arrival = relocated.arrival(i)
-                residual = arrival.timeResidual()
-                residuals.append(residual)
-                distance = arrival.distance()
-                distances.append(distance)
+            for i, arrival in enumerate(arrivals):
+                residuals[i] = arrival.timeResidual()
+                distances[i] = arrival.distance()
                 if arrival.timeUsed():
                     usedPhaseCount += 1
-                associatedPhaseCount += 1
-            rms = numpy.sqrt(sum(numpy.array(residuals) ** 2)/len(residuals))
+            rms = numpy.sqrt(numpy.mean(residuals**2))
             quality.setStandardError(rms)
-            quality.setAssociatedPhaseCount(associatedPhaseCount)
+            quality.setAssociatedPhaseCount(n)
             quality.setUsedPhaseCount(usedPhaseCount)
-            distances.sort()
-            quality.setMinimumDistance(distances[0])
-            quality.setMaximumDistance(distances[-1])
+            quality.setMinimumDistance(distances.min())
+            quality.setMaximumDistance(distances.max())
             quality.setMedianDistance(numpy.median(distances))
-            agap = scocto.util.computeAzimuthalGap(relocated)
-            sgap = scocto.util.computeSecondaryAzimuthalGap(relocated)
+            agap, sgap, tgap = scocto.util.computeAzimuthalGaps(relocated)
             quality.setAzimuthalGap(agap)
             quality.setSecondaryAzimuthalGap(sgap)
             relocated.setQuality(quality)
@@ -573,9 +648,7 @@ class App(seiscomp.client.Application):
         origins.extend(relocated_origins)
 
         if not self.want_raw_pyocto_locations:
-            discarded_origins = [origin for origin in origins if origin.methodID() == "PyOcto"]
-            for origin in discarded_origins:
-                origins.remove(origin)
+            origins[:] = [origin for origin in origins if origin.methodID() != "PyOcto"]
 
     def process(self, objects):
         origins = self.associator.process(objects)
@@ -630,11 +703,12 @@ class App(seiscomp.client.Application):
         - Finally write back EventParameters to file
         """
         # Sort objects by either creation or pick time
-        objectTime = scocto.util.pickTime if self.use_pick_time else scocto.util.creationTime
-        objects.sort(key=lambda obj: objectTime(obj))
+        objectTime = scocto.util.pickEpoch if self.use_pick_time else scocto.util.creationEpoch
+        objects.sort(key=objectTime)
 
-        for obj in objects:
-            seiscomp.logging.debug(obj.publicID())
+        if self.debugEnabled:
+            for obj in objects:
+                seiscomp.logging.debug(obj.publicID())
 
         for obj in objects:
             self.addObject("", obj)
@@ -665,6 +739,7 @@ class App(seiscomp.client.Application):
                 self.processingMode = "offline"
 
         self.setupStreamWhitelist()
+        self.setupPickAuthorWhitelist()
         self.setupInventory()
 
         if self.centerLatLon is None:
@@ -689,11 +764,16 @@ class App(seiscomp.client.Application):
 
         if self.inputXML and self.inventoryXML:
             ep = scocto.util.readEventParametersFromXML(self.inputXML)
+            timeWindow = self.startTime is not None and self.endTime is not None
+            if timeWindow:
+                tmin = scocto.util.time2float(startTime)
+                tmax = scocto.util.time2float(endTime)
             objects = list()
             for obj in scocto.util.EventParametersPicks(ep):
                 pick = seiscomp.datamodel.Pick.Cast(obj)
-                if self.startTime is not None and self.endTime is not None:
-                    if not startTime <= scocto.util.pickTime(pick) <= endTime:
+                if timeWindow:
+                    # also caches the float pick time for later use
+                    if not tmin <= scocto.util.pickEpoch(pick) <= tmax:
                         continue
                 objects.append(pick)
         elif self.startTime is not None and self.endTime is not None:
@@ -760,14 +840,15 @@ class App(seiscomp.client.Application):
 
     def checkPickAuthor(self, pick):
         """
-        Author check against the specified list of pick authors.
+        Author check against the specified list of pick authors, which
+        may contain wildcards like in 'scautopick*'.
 
         If this list was not specified, all picks with pass this check.
         """
-        if not self.pickAuthors:
+        if not self.pickAuthorWhitelist:
             return True
         pickAuthor = pick.creationInfo().author()
-        if pickAuthor in self.pickAuthors:
+        if self.pickAuthorWhitelist.matches(pickAuthor):
             return True
         msg = "pick %s %s -> stop" % (
             pick.publicID(),
@@ -780,13 +861,7 @@ class App(seiscomp.client.Application):
             return True
 
         # Station whitelist match
-        matches = self.whitelist.matches(pick.waveformID())
-        msg = "pick " + pick.publicID()
-        if matches:
-            msg = msg + " matches stream whitelist"
-        else:
-            msg = msg + " no match with stream whitelist -> stop"
-        return matches
+        return self.whitelist.matches(pick.waveformID())
 
     def checkPick(self, pick):
         if not self.checkStation(pick):
@@ -801,10 +876,12 @@ class App(seiscomp.client.Application):
         return True
 
     def storePick(self, pick):
-        self.picks[pick.publicID()] = pick
-        self.sortedPicks.append(pick)
-        objectTime = scocto.util.pickTime
-        self.sortedPicks.sort(key=lambda x: objectTime(x))
+        pickID = pick.publicID()
+        if pickID in self.picks:
+            seiscomp.logging.debug("pick %s already stored -> stop" % pickID)
+            return False
+        self.picks[pickID] = pick
+        self.pickBuffer.insert(pick)
         self.pickQueue.append(pick)
 
         if self.processingMode == "playback":
@@ -823,37 +900,80 @@ class App(seiscomp.client.Application):
             return self.playbackTime
 
     def processPickQueue(self):
-        now = self.now()
-        processedPicks = list()
+        now = scocto.util.time2float(self.now())
+        pickEpoch = scocto.util.pickEpoch
+        pickDelay = self.pickDelay
+        pendingPicks = list()
+        duePicks = list()
         for pick in self.pickQueue:
-            if float(now - scocto.util.pickTime(pick)) < self.pickDelay:
+            if now - pickEpoch(pick) < pickDelay:
                 # pick not yet due
-                continue
-            self.processPick(pick)
-            processedPicks.append(pick)
-        for pick in processedPicks:
-            self.pickQueue.remove(pick)
+                pendingPicks.append(pick)
+            else:
+                duePicks.append(pick)
+        self.pickQueue = pendingPicks
+
+        for batch in self.pickBatches(duePicks):
+            self.processPicks(batch)
+        self.publishOrigins()
 
         return True
 
-    def processPick(self, new_pick):
-        seiscomp.logging.info("Processing pick " + new_pick.publicID())
-        if self.processingMode == "playback":
-            tstr = scocto.util.time2str(scocto.util.creationTime(new_pick))
-            seiscomp.logging.debug("Playback time is " + tstr)
+    def pickBatches(self, picks):
+        """
+        Group picks in the order of their pick times into batches of
+        picks not more than self.pickBatchSpan seconds apart. The
+        picks of a batch are processed in a single associator run.
+        """
+        pickEpoch = scocto.util.pickEpoch
+        span = self.pickBatchSpan
+        batch = list()
+        t0 = None
+        for pick in sorted(picks, key=pickEpoch):
+            t = pickEpoch(pick)
+            if batch and t - t0 > span:
+                yield batch
+                batch = list()
+            if not batch:
+                t0 = t
+            batch.append(pick)
+        if batch:
+            yield batch
+
+    def processPicks(self, new_picks):
+        """
+        Process the new picks, sorted by pick time, together with the
+        other picks within a small time window.
+        """
+        for new_pick in new_picks:
+            seiscomp.logging.info("Processing pick " + new_pick.publicID())
+            if self.debugEnabled and self.processingMode == "playback":
+                tstr = scocto.util.time2str(scocto.util.creationTime(new_pick))
+                seiscomp.logging.debug("Playback time is " + tstr)
+
+        # Process picks in the context of other picks within a small time window
+        dt = 120 + self.pickDelay
+        t0 = scocto.util.pickEpoch(new_picks[0])
+        t1 = scocto.util.pickEpoch(new_picks[-1])
+        lo, hi = self.pickBuffer.window(t0 - dt, t1 + dt)
+        if hi - lo < self.min_num_p_picks:
+            return
+
+        # There is at most one P pick per station, so if the picks are
+        # from too few stations, there is no need to run the associator.
+        stationCount = len(set(self.pickBuffer.stations[lo:hi]))
+        if stationCount < self.min_num_p_picks:
+            seiscomp.logging.debug("Too few stations in vicinity: %d" % stationCount)
+            return
 
-        # Process pick in the context of other picks within a small time window
-        dt = seiscomp.core.TimeSpan(120 + self.pickDelay)
-        tmin = new_pick.time().value() - dt
-        tmax = new_pick.time().value() + dt
-        time = scocto.util.pickTime
-        picks = [p for p in self.sortedPicks if tmin < time(p) < tmax]
+        picks = self.pickBuffer.picks[lo:hi]
 
         # debugging only
-        if len(picks) > 1:
+        if self.debugEnabled:
+            time = scocto.util.pickEpoch
             seiscomp.logging.debug("Number of picks in vicinity: %d" % (len(picks)))
             for pick in picks:
-                dt = time(pick) - time(new_pick)
+                dt = time(pick) - t0
                 try:
                     ph = str(pick.phaseHint().code())
                 except ValueError:
@@ -861,19 +981,17 @@ class App(seiscomp.client.Application):
 
                 seiscomp.logging.debug("%+7.3f %s %s" % (dt, ph, pick.publicID()))
 
-        if len(picks) < self.min_num_p_picks:
-            return
-
         origins = self.process(picks)
         if not origins:
             return
 
         filtered_origins = []
 
+        newPickIDs = frozenset(pick.publicID() for pick in new_picks)
         for origin in origins:
-            if not scocto.util.originReferencesPick(origin, new_pick):
+            if newPickIDs.isdisjoint(scocto.util.originPickIDs(origin)):
                 msg = "new origin " + origin.publicID() + \
-                    " doesn't reference new pick " + new_pick.publicID()
+                    " doesn't reference any new pick"
                 seiscomp.logging.debug(msg)
                 seiscomp.logging.debug("Dismissing this origin")
                 continue
@@ -884,11 +1002,11 @@ class App(seiscomp.client.Application):
 
         self.relocateOrigins(origins)
 
-        discarded_origins = list()
+        accepted_origins = list()
 
         for origin in origins:
             seiscomp.logging.debug("new origin " + origin.publicID())
-            s = scocto.util.printOrigin(origin, self.sortedPicks)
+            s = scocto.util.printOrigin(origin, self.picks)
             seiscomp.logging.info(s)
 
             matching_event = self.event_list.find_matching_event(origin)
@@ -902,57 +1020,77 @@ class App(seiscomp.client.Application):
                     seiscomp.logging.debug("improvement: %d -> %d" % (last.arrivalCount(), origin.arrivalCount()))
                 else:
                     seiscomp.logging.debug("no improvement - skipping origin")
-                    discarded_origins.append(origin)
                     continue
             else:
                 seiscomp.logging.debug("new event")
                 seiscomp.logging.debug("improvement: %d -> %d" % (0, origin.arrivalCount()))
                 matching_event = MyEvent()
-                self.event_list.append(matching_event)
+                self.event_list.append_event(matching_event)
 
-            matching_event.set_origin(origin, self.picks)
+            self.event_list.set_origin(matching_event, origin, self.picks)
+            accepted_origins.append(origin)
 
             if matching_event.lastPublished:
                 pass
 
-        for discarded_origin in discarded_origins:
-            origins.remove(discarded_origin)
+        origins = accepted_origins
 
+        # The creation info is the same for all origins and copied by
+        # setCreationInfo()
+        ci = seiscomp.datamodel.CreationInfo()
+        ci.setAgencyID(self.agencyID())
+        ci.setAuthor(self.author())
+        ci.setCreationTime(self.now())
         for origin in origins:
             if origin.methodID() == "PyOcto":
-                newPublicID = seiscomp.datamodel.Origin.Create().publicID().replace("/", "/PyOcto/")
-                origin.setPublicID(newPublicID)
-            now = self.now()
-            ci = seiscomp.datamodel.CreationInfo()
-            ci.setAgencyID(self.agencyID())
-            ci.setAuthor(self.author())
-            ci.setCreationTime(now)
+                # GenerateId() assigns a new ID to the origin itself,
+                # which saves creating a throwaway origin just for its ID.
+                # If that fails, the origin keeps its preliminary ID.
+                if seiscomp.datamodel.PublicObject.GenerateId(origin):
+                    origin.setPublicID(origin.publicID().replace("/", "/PyOcto/"))
+                else:
+                    seiscomp.logging.error(
+                        "Failed to generate public ID for " + origin.publicID())
             origin.setCreationInfo(ci)
             origin.setEvaluationMode(seiscomp.datamodel.AUTOMATIC)
 
+        # Published together with the origins of the other batches
+        # processed in the same pass, see publishOrigins()
+        self.pendingOrigins.extend(origins)
+
+        return True
+
+    def publishOrigins(self):
+        """
+        Publish all pending origins. In online mode these are sent in a
+        single notifier message.
+        """
+        origins = self.pendingOrigins
+        if not origins:
+            return
+        self.pendingOrigins = list()
+
         if self.processingMode == "playback":
             for origin in origins:
                 self.ep.add(origin)
         else:
-            ep = seiscomp.datamodel.EventParameters()
+            ep = self.outputEP
             seiscomp.datamodel.Notifier.Enable()
             for origin in origins:
                 ep.add(origin)
             msg = seiscomp.datamodel.Notifier.GetMessage()
             seiscomp.datamodel.Notifier.Disable()
-
-        if self.processingMode != "online" or self.commandline().hasOption("test"):
             for origin in origins:
-                seiscomp.logging.info("test/offline/playback mode - not sending " + origin.publicID())
-        else:
-            if self.connection().send(msg):
-                for origin in origins:
-                    seiscomp.logging.info("sent " + origin.publicID())
-            else:
-                for origin in origins:
-                    seiscomp.logging.info("failed to send " + origin.publicID())
+                ep.remove(origin)
 
-        return True
+        if self.processingMode != "online" or self.test:
+            status = "test/offline/playback mode - not sending "
+        elif self.connection().send(msg):
+            status = "sent "
+        else:
+            status = "failed to send "
+        for origin in origins:
+            seiscomp.logging.info(status + origin.publicID())
 
     def addPick(self, pick):
         """
@@ -978,7 +1116,26 @@ class App(seiscomp.client.Application):
             self.addPick(pick)
 
     def cleanup(self):
-        pass
+        """
+        In online mode, forget about picks that are too old to fall into
+        the time window of any new pick. Otherwise the pick buffers would
+        grow indefinitely and so would the cost of maintaining them.
+        """
+        if self.processingMode != "online":
+            return
+
+        # The time window of a pick that is due now reaches back about
+        # 2*pickDelay + 120 seconds, see processPicks(). Picks within
+        # that window, plus a margin for late picks, must be kept.
+        maxPickAge = max(self.maxPickAge, 2*self.pickDelay + 120 + 600)
+        tmin = scocto.util.time2float(self.now()) - maxPickAge
+        removed = self.pickBuffer.removeOlderThan(tmin)
+        if not removed:
+            return
+
+        for pick in removed:
+            del self.picks[pick.publicID()]
+        seiscomp.logging.debug("Removed %d old picks" % len(removed))
 
     def handleTimeout(self):
         self.processPickQueue()
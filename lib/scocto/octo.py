@@ -14,12 +14,16 @@
 ###########################################################################
 
 import time
-import datetime
+import atexit
+import shutil
 import pathlib
+import tempfile
+import numpy
 import pandas
 import seiscomp.logging as log
 import seiscomp.datamodel
 import scocto.util
+import scocto.whitelist
 import pyproj
 import pyocto
 
@@ -30,38 +34,24 @@ debug_data_dir = pathlib.Path("debug")
 
 def convertPicksToPyOcto(objects):
     log.debug("Preparing pyocto picks")
-    picks = pandas.core.frame.DataFrame()
 
-    _st  = list()
-    _ph = list()
-    _tm = list()
-    _ev = list()
-    _id = list()
+    rows = list()
     for obj in objects:
         pick = seiscomp.datamodel.Pick.Cast(obj)
         if not pick:
             continue 
         n, s, l, c = scocto.util.nslc(pick)
-        _st.append("%s.%s.%s" % (n, s, l))
         try:
             ph = str(pick.phaseHint().code())
         except ValueError:
             ph = "P"
         if not ph:
             ph = "P"
-        _ph.append(ph)
-        tm = scocto.util.time2str(pick.time().value())
-        tm = pandas.Timestamp(tm)
-        _tm.append(tm)
-        _ev.append(0)
-        _id.append(pick.publicID())
-    picks["station"] = _st
-    picks["phase"] = _ph
-    picks["time"] = _tm
-    picks["event"] = [-1]*len(_ev)
-    picks["public_id"] = _id
-
-    picks["time"] = picks["time"].apply(lambda x: x.timestamp())
+        tm = scocto.util.pickEpoch(pick)
+        rows.append(("%s.%s.%s" % (n, s, l), ph, tm, -1, pick.publicID()))
+
+    picks = pandas.DataFrame(
+        rows, columns=["station", "phase", "time", "event", "public_id"])
 
     return picks
 
@@ -69,11 +59,28 @@ def convertPicksToPyOcto(objects):
 origin_count = 0
 
 
-def convertOriginFromPyocto(ievent, idx, pyocto_stations, pyocto_events, pyocto_assignments):
+# Phase objects by phase code. As setPhase() copies the phase, they
+# can be shared by all arrivals.
+phases = dict()
+
+
+def getPhase(code):
+    try:
+        return phases[code]
+    except KeyError:
+        phase = phases[code] = seiscomp.datamodel.Phase(code)
+        return phase
+
+
+def convertOriginFromPyocto(ievent, station_coordinates, pyocto_events, event_assignments):
+    """
+    Convert event number ievent of the PyOcto events to an origin.
+    event_assignments are the PyOcto pick assignments of only this event.
+    """
     global origin_count
 
     events = pyocto_events
-    assign = pyocto_assignments
+    assign = event_assignments
 
     origin_count += 1
     public_id = "Origin/PyOcto/%09d" % (origin_count)
@@ -92,27 +99,33 @@ def convertOriginFromPyocto(ievent, idx, pyocto_stations, pyocto_events, pyocto_
     origin.setEvaluationMode(seiscomp.datamodel.AUTOMATIC)
     origin.setEvaluationStatus(seiscomp.datamodel.PRELIMINARY)
 
-    for ipick, event_idx in enumerate(assign["event_idx"]):
-        if event_idx != idx:
-            continue
-        pick_id = assign["public_id"][ipick]
-        residual = assign["residual"][ipick]
-        phase = assign["phase"][ipick]
-        scode = assign["station"][ipick]
+    # Distances and azimuths to all stations in one step
+    stations = assign["station"].values
+    slat = numpy.array([station_coordinates[scode][0] for scode in stations])
+    slon = numpy.array([station_coordinates[scode][1] for scode in stations])
+    delta, az = scocto.util.deltaAzimuth(elat.value(), elon.value(), slat, slon)
+
+    pick_ids = list()
+    for i, (pick_id, residual, phase) in enumerate(zip(
+            assign["public_id"].values, assign["residual"].values,
+            assign["phase"].values)):
+        pick_ids.append(pick_id)
 
         arrival = seiscomp.datamodel.Arrival()
         arrival.setPickID(pick_id)
-        arrival.setPhase(seiscomp.datamodel.Phase(phase))
+        arrival.setPhase(getPhase(phase))
         arrival.setTimeResidual(residual)
-        i = pyocto_stations["id"].to_list().index(scode)
-        slat = pyocto_stations["latitude"][i]
-        slon = pyocto_stations["longitude"][i]
-        delta, az, baz = seiscomp.math.delazi(elat.value(), elon.value(), slat, slon)
-        arrival.setAzimuth(az)
-        arrival.setDistance(delta)
+        # All arrivals are initially used by the locator with full weight
+        arrival.setWeight(1)
+        arrival.setTimeUsed(True)
+        arrival.setAzimuth(float(az[i]))
+        arrival.setDistance(float(delta[i]))
 
         origin.add(arrival)
 
+    # Saves walking the arrivals again in scocto.util.originPickIDs()
+    origin._pickIDs = frozenset(pick_ids)
+
     return origin
 
 
@@ -143,12 +156,37 @@ def createConstantVelocityModel(spec_string):
     return velocity_model
 
 
+# Travel time tables created by this process, keyed by the CSV file,
+# its modification time and the arguments of create_model(). The files
+# live in a private directory that is removed when the process exits.
+_MODEL_CACHE = dict()
+_model_dir = None
+
+
+def _modelDirectory():
+    global _model_dir
+    if _model_dir is None:
+        _model_dir = pathlib.Path(tempfile.mkdtemp(prefix="scoctoloc-"))
+        atexit.register(shutil.rmtree, _model_dir, True)
+    return _model_dir
+
+
 def createVelocityModelFromCSV(csv_filename, max_distance, max_depth):
     # Read model from file (requires pyrocko!)
-    tmp_path = pathlib.Path("/tmp")
-    model_path = tmp_path / "model"
-    layers = pandas.read_csv(csv_filename)
-    pyocto.VelocityModel1D.create_model(layers, 1, max_distance, max_depth, model_path)
+    #
+    # Creating the travel time tables takes a while, so they are only
+    # created once per process for the same model file and arguments.
+    csv_path = pathlib.Path(csv_filename)
+    key = (str(csv_path.resolve()), csv_path.stat().st_mtime_ns,
+           max_distance, max_depth)
+    model_path = _MODEL_CACHE.get(key)
+    if model_path is None:
+        model_path = _modelDirectory() / ("model-%d" % len(_MODEL_CACHE))
+        layers = pandas.read_csv(csv_filename)
+        pyocto.VelocityModel1D.create_model(layers, 1, max_distance, max_depth, model_path)
+        _MODEL_CACHE[key] = model_path
+    else:
+        log.debug("Reusing velocity model " + str(model_path))
     velocity_model = pyocto.VelocityModel1D(model_path, 2.0)
     return velocity_model
 
@@ -162,7 +200,8 @@ class Associator(pyocto.OctoAssociator):
             min_num_p_and_s_picks=0,
             min_num_p_or_s_picks=4,
             velocity_model=None,
-            debug_data_dir=None):
+            debug_data_dir=None,
+            debug_dump_interval=1):
         self.pick_match_tolerance = 6.
 
         self.center_lat = center_lat
@@ -196,13 +235,22 @@ class Associator(pyocto.OctoAssociator):
             pick_match_tolerance=self.pick_match_tolerance,
             crs=crs_local,)
 
-        # This is a list of only network, station, location codes of the
+        # This is a set of only network, station, location codes of the
         # configured sensors, to avoid feeding picks for unconfigured
         # stations.
-        self.stream_nsl = []
+        self.stream_nsl = set()
 
         # White list of accepted pick authors
-        self.accepted_authors = ["scautopick"]
+        self.accepted_authors = scocto.whitelist.AuthorWhitelist(["scautopick"])
+
+        # Whether debug log output is wanted. Used to skip preparing
+        # debug output that would be discarded anyway.
+        self.debug_enabled = False
+
+        # With debug output enabled, the picks of only every n-th
+        # associator run are written to the debug data directory
+        self.debug_dump_interval = debug_dump_interval
+        self.process_count = 0
 
     def enablePyOctoDebugOutput(self, debug_data_dir):
         self.debug_data_dir = debug_data_dir
@@ -213,13 +261,13 @@ class Associator(pyocto.OctoAssociator):
 
     def setPickAuthors(self, authors):
         """
-        Set whitelist of accepted pick authors
+        Set whitelist of accepted pick authors, which may contain
+        wildcards
         """
-        self.accepted_authors = authors
+        self.accepted_authors = scocto.whitelist.AuthorWhitelist(authors or [])
 
     def convertInventoryToPyOcto(self, inventory, whitelist=None):
         log.debug("Preparing pyocto inventory")
-        stations = pandas.core.frame.DataFrame()
 
         tmp = dict()
         for item in scocto.util.InventoryIterator(inventory):
@@ -240,26 +288,24 @@ class Associator(pyocto.OctoAssociator):
             # Keep track of the sensors that passed the whitelist
             # and/or geographical selection criteria. Picks from all
             # other sensors will be rejected.
-            nsl = (n, s, l)
-            if nsl not in self.stream_nsl:
-                self.stream_nsl.append(nsl)
-
-        _st  = list()
-        _lat = list()
-        _lon = list()
-        _ele = list()
-        for n, s, l in tmp:
-            latitude, longitude, elevation = tmp[n, s, l]
-            _id = "%s.%s.%s" % (n, s, l)
-            log.debug(_id)
-            _st.append(_id)
-            _lat.append(latitude)
-            _lon.append(longitude)
-            _ele.append(elevation)
-        stations["id"] = _st
-        stations["latitude"] = _lat
-        stations["longitude"] = _lon
-        stations["elevation"] = _ele
+            self.stream_nsl.add((n, s, l))
+
+        _st  = [ "%s.%s.%s" % nsl for nsl in tmp ]
+        _lat = [ coordinates[0] for coordinates in tmp.values() ]
+        _lon = [ coordinates[1] for coordinates in tmp.values() ]
+        _ele = [ coordinates[2] for coordinates in tmp.values() ]
+        if self.debug_enabled:
+            for _id in _st:
+                log.debug(_id)
+        stations = pandas.DataFrame({
+            "id": _st,
+            "latitude": _lat,
+            "longitude": _lon,
+            "elevation": _ele })
+
+        # Station latitude and longitude by station ID, for the
+        # conversion of the PyOcto assignments to arrivals
+        self.station_coordinates = dict(zip(_st, zip(_lat, _lon)))
 
         self.pyocto_stations = stations
         if self.debug_data_dir:
@@ -277,7 +323,7 @@ class Associator(pyocto.OctoAssociator):
             return False
 
         author = pick.creationInfo().author()
-        if self.accepted_authors and author not in self.accepted_authors:
+        if self.accepted_authors and not self.accepted_authors.matches(author):
             return False
 
         return True
@@ -294,7 +340,9 @@ class Associator(pyocto.OctoAssociator):
             return []
 
         pyocto_picks = convertPicksToPyOcto(filtered_picks)
-        if self.debug_data_dir:
+        self.process_count += 1
+        if self.debug_data_dir and \
+                self.process_count % self.debug_dump_interval == 0:
             # This file can be used as input for @yetinam's PyOcto examples,
             # which may be useful for debugging.
             pyocto_picks.to_parquet(self.debug_data_dir / "picks")
@@ -312,10 +360,8 @@ class Associator(pyocto.OctoAssociator):
             len(pyocto_events), len(pyocto_assignments)))
 
         self.transform_events(pyocto_events)
-        pyocto_events["time"] = pyocto_events["time"].apply(
-            datetime.datetime.fromtimestamp, tz=datetime.timezone.utc)
-        pyocto_assignments["time"] = pyocto_assignments["time"].apply(
-            datetime.datetime.fromtimestamp, tz=datetime.timezone.utc)
+        pyocto_events["time"] = pandas.to_datetime(
+            pyocto_events["time"], unit="s", utc=True)
 
         del pyocto_events["x"]
         del pyocto_events["y"]
@@ -324,11 +370,19 @@ class Associator(pyocto.OctoAssociator):
         del pyocto_assignments["pick_idx"]
         del pyocto_assignments["time"]
 
-        log.debug("#### origins\n" + str(pyocto_events))
+        if self.debug_enabled:
+            log.debug("#### origins\n" + str(pyocto_events))
+
+        # Split the assignments by event once instead of scanning all
+        # of them for each event
+        assignments_by_event = dict(
+            list(pyocto_assignments.groupby("event_idx")))
+        no_assignments = pyocto_assignments.iloc[:0]
 
         origins = list()
         for ievent, idx in enumerate(pyocto_events["idx"]):
-            origin = convertOriginFromPyocto(ievent, idx, self.pyocto_stations, pyocto_events, pyocto_assignments)
+            event_assignments = assignments_by_event.get(idx, no_assignments)
+            origin = convertOriginFromPyocto(ievent, self.station_coordinates, pyocto_events, event_assignments)
             origins.append(origin)
 
         return origins
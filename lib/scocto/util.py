@@ -15,33 +15,36 @@
 
 import seiscomp.datamodel
 import seiscomp.io
-import math
 import numpy
+import operator
+
+
+# Mean earth radius, consistent with 111.195 km per degree
+earth_radius_km = 6371.0
 
 
 def time2str(time, digits=3):
     """
     Convert a seiscomp.core.Time to a string
     """
-    return time.toString("%Y-%m-%d %H:%M:%S.%f000000")[:20+digits].strip(".")
+    if digits <= 0:
+        return time.toString("%Y-%m-%d %H:%M:%S")
+    return time.toString("%Y-%m-%d %H:%M:%S.%f000000")[:20+digits]
+
+
+def time2float(time):
+    """
+    Convert a seiscomp.core.Time to seconds since epoch as float
+    """
+    return time.seconds() + 1.e-6*time.microseconds()
 
 
 def lat2str(lat):
-    s = "%.3f " % abs(lat)
-    if lat >= 0:
-        s += "N"
-    else:
-        s += "S"
-    return s
+    return "%.3f %s" % (abs(lat), "N" if lat >= 0 else "S")
 
 
 def lon2str(lon):
-    s = "%.3f " % abs(lon)
-    if lon >= 0:
-        s += "E"
-    else:
-        s += "W"
-    return s
+    return "%.3f %s" % (abs(lon), "E" if lon >= 0 else "W")
 
 
 def parseTime(s):
@@ -62,6 +65,30 @@ def pickTime(pick):
     return pick.time().value()
 
 
+def creationEpoch(obj):
+    """
+    Creation time of obj as float seconds since epoch. The value is
+    cached on obj, which saves the calls into the SeisComP bindings
+    when the same object is looked at many times.
+    """
+    try:
+        return obj._creationEpoch
+    except AttributeError:
+        t = obj._creationEpoch = time2float(creationTime(obj))
+        return t
+
+
+def pickEpoch(pick):
+    """
+    Pick time as float seconds since epoch, cached like creationEpoch()
+    """
+    try:
+        return pick._pickEpoch
+    except AttributeError:
+        t = pick._pickEpoch = time2float(pickTime(pick))
+        return t
+
+
 def nslc(obj):
     """
     Convenience function to retrieve network, station, location and
@@ -77,14 +104,30 @@ def nslc(obj):
     return n, s, l, c
 
 
+def originArrivals(origin):
+    """
+    Return the arrivals of the origin as tuple.
+
+    Like originPickIDs() the result is cached on the origin object.
+    """
+    try:
+        return origin._arrivals
+    except AttributeError:
+        arrivals = origin._arrivals = tuple(
+            origin.arrival(i) for i in range(origin.arrivalCount()))
+        return arrivals
+
+
 def sortedArrivals(origin):
-    arrivals = [ origin.arrival(i) for i in range(origin.arrivalCount()) ]
-    return sorted(arrivals, key=lambda t: t.distance())
+    return sorted(originArrivals(origin), key=operator.methodcaller("distance"))
 
 
 def printOrigin(origin, picks):
     """
     Pretty printing an origin for debug output
+
+    picks is either a dict of picks keyed by public ID or an iterable
+    of picks, which must include the picks referenced by the origin.
     """ 
     lines = list()
     tim = origin.time().value()
@@ -108,7 +151,8 @@ def printOrigin(origin, picks):
     lines.append("depth      %6.2f km" % dep)
     lines.append("arrivals:")
 
-    picks = { p.publicID(): p for p in picks }
+    if not isinstance(picks, dict):
+        picks = { p.publicID(): p for p in picks }
 
     for arr in sortedArrivals(origin):
         pick = picks[arr.pickID()]
@@ -125,17 +169,28 @@ def printOrigin(origin, picks):
     return "\n".join(lines)
 
 
+def originPickIDs(origin):
+    """
+    Return the set of pick IDs referenced by the arrivals of the origin.
+
+    The set is cached on the origin object, so the arrivals are only
+    walked once. Only use this with origins whose arrivals don't change
+    anymore.
+    """
+    try:
+        return origin._pickIDs
+    except AttributeError:
+        pickIDs = origin._pickIDs = frozenset(
+            arrival.pickID() for arrival in originArrivals(origin))
+        return pickIDs
+
+
 def originReferencesPick(origin, pick):
     """
     Check whether one of the arrivals of the origin references the pick,
     in other words: whether the pick is associated to that origin.
     """
-    pick_id = pick.publicID()
-    for i in range(origin.arrivalCount()):
-        arrival = origin.arrival(i)
-        if arrival.pickID() == pick_id:
-            return True
-    return False
+    return pick.publicID() in originPickIDs(origin)
 
 
 def sumOfLargestGaps(azi, n=2):
@@ -143,29 +198,22 @@ def sumOfLargestGaps(azi, n=2):
     From an unsorted list of azimuth values, determine the
     largest n gaps and return their sum.
     """
-
-    gap = []
-    aziCount = len(azi)
-    if aziCount < 2:
+    if len(azi) < 2:
         return 360.
-    azi = sorted(azi)
-
-    for i in range(1, aziCount):
-        gap.append(azi[i] - azi[i-1])
-    gap.append(azi[0] - azi[aziCount-1] + 360)
-    gap = sorted(gap, reverse=True)
-    return sum(gap[0:n])
+    gap = azimuthalGaps(numpy.sort(azi))
+    if n >= len(gap):
+        return float(gap.sum())
+    # Only the n largest gaps are needed, no need to fully sort them
+    return float(numpy.partition(gap, -n)[-n:].sum())
 
 
 def azimuths(origin, maxDelta=180, minWeight=0.5):
     """
-    Returns a sorted list of azimuths for all arrivals within
-    maxDelta and with the specified minimum weight.
+    Returns a sorted array of the distinct azimuths of all arrivals
+    within maxDelta and with the specified minimum weight.
     """
     azi = []
-    arrivalCount = origin.arrivalCount()
-    for i in range(arrivalCount):
-        arr = origin.arrival(i)
+    for arr in originArrivals(origin):
         try:
             azimuth = arr.azimuth()
             weight  = arr.weight()
@@ -173,12 +221,31 @@ def azimuths(origin, maxDelta=180, minWeight=0.5):
         except ValueError:
             continue
         if weight >= minWeight and delta <= maxDelta:
-            azimuth = math.fmod(azimuth, 360.)
-            if azimuth < 0:
-                azimuth += 360.
-            if azimuth not in azi:
-                azi.append(azimuth)
-    return sorted(azi)
+            azi.append(azimuth)
+    # numpy.unique sorts and removes duplicates in one step
+    return numpy.unique(numpy.mod(azi, 360.))
+
+
+def azimuthalGaps(azi):
+    """
+    From a sorted array of azimuths, return the array of gaps between
+    neighbouring azimuths including the gap across north.
+    """
+    return numpy.diff(azi, append=azi[0] + 360)
+
+
+def computeAzimuthalGaps(origin, maxDelta=180, minWeight=0.5):
+    """
+    Compute the largest azimuthal gap, the secondary azimuthal gap and
+    the TGap in one go, so that the arrivals are only walked once.
+    """
+    azi = azimuths(origin, maxDelta, minWeight)
+    if len(azi) < 2:
+        return 360., 360., 360.
+
+    gap = azimuthalGaps(azi)
+    sgap = gap[1:] + gap[:-1]
+    return float(gap.max()), float(sgap.max()), sumOfLargestGaps(azi, n=2)
 
 
 def computeAzimuthalGap(origin, maxDelta=180, minWeight=0.5):
@@ -186,14 +253,10 @@ def computeAzimuthalGap(origin, maxDelta=180, minWeight=0.5):
     Compute the largest azimuthal gap
     """
     azi = azimuths(origin, maxDelta, minWeight)
-    aziCount = len(azi)
-    if aziCount < 2:
+    if len(azi) < 2:
         return 360.
 
-    azi.append(azi[0] + 360)
-    azi = numpy.array(azi)
-    gap = azi[1:] - azi[:-1]
-    return max(gap)
+    return float(azimuthalGaps(azi).max())
 
 
 def computeSecondaryAzimuthalGap(origin, maxDelta=180, minWeight=0.5):
@@ -202,15 +265,12 @@ def computeSecondaryAzimuthalGap(origin, maxDelta=180, minWeight=0.5):
     two azimuthal gaps separated only by a single station.
     """
     azi = azimuths(origin, maxDelta, minWeight)
-    aziCount = len(azi)
-    if aziCount < 2:
+    if len(azi) < 2:
         return 360.
 
-    azi.append(azi[0] + 360)
-    azi = numpy.array(azi)
-    gap = azi[1:] - azi[:-1]
+    gap = azimuthalGaps(azi)
     sgap = gap[1:] + gap[:-1]
-    return max(sgap)
+    return float(sgap.max())
 
 
 def computeTGap(origin, maxDelta=180, minWeight=0.5):
@@ -224,21 +284,65 @@ def computeTGap(origin, maxDelta=180, minWeight=0.5):
     return sumOfLargestGaps(azi, n=2)
 
 
+def originCoordinates(origin):
+    """
+    Return latitude, longitude, depth and time (as float epoch seconds)
+    of the origin as tuple.
+
+    The tuple is cached on the origin object. Only use this with origins
+    whose location doesn't change anymore.
+    """
+    try:
+        return origin._coordinates
+    except AttributeError:
+        coordinates = origin._coordinates = (
+            origin.latitude().value(),
+            origin.longitude().value(),
+            origin.depth().value(),
+            time2float(origin.time().value()))
+        return coordinates
+
+
 def originDistanceKm(origin1, origin2):
-    lat1 = origin1.latitude().value()
-    lat2 = origin2.latitude().value()
-    lon1 = origin1.longitude().value()
-    lon2 = origin2.longitude().value()
-    dep1 = origin1.depth().value()
-    dep2 = origin2.depth().value()
-    delta, az, baz = seiscomp.math.delazi_wgs84(lat1, lon1, lat2, lon2)
-    delta_km = delta*111.195
+    lat1, lon1, dep1, tim1 = originCoordinates(origin1)
+    lat2, lon2, dep2, tim2 = originCoordinates(origin2)
+    delta_km = haversineKm(lat1, lon1, lat2, lon2)
     dist_km = (delta_km**2 + (dep2-dep1)**2)**0.5
-    return dist_km
+    return float(dist_km)
+
+
+def haversineKm(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance in km between points specified by their
+    latitudes and longitudes in degrees. Any of the arguments may be
+    a NumPy array in order to compute many distances in one call.
+    """
+    lat1, lon1, lat2, lon2 = map(numpy.radians, (lat1, lon1, lat2, lon2))
+    a = numpy.sin(0.5*(lat2-lat1))**2 + \
+        numpy.cos(lat1)*numpy.cos(lat2)*numpy.sin(0.5*(lon2-lon1))**2
+    return 2*earth_radius_km*numpy.arcsin(numpy.sqrt(a))
+
+
+def deltaAzimuth(lat1, lon1, lat2, lon2):
+    """
+    Epicentral distance and azimuth in degrees from point 1 to point 2
+    on a sphere. Like for haversineKm(), any of the arguments may be a
+    NumPy array.
+    """
+    lat1, lon1, lat2, lon2 = map(numpy.radians, (lat1, lon1, lat2, lon2))
+    dlon = lon2-lon1
+    a = numpy.sin(0.5*(lat2-lat1))**2 + \
+        numpy.cos(lat1)*numpy.cos(lat2)*numpy.sin(0.5*dlon)**2
+    delta = numpy.degrees(2*numpy.arcsin(numpy.sqrt(a)))
+    azimuth = numpy.degrees(numpy.arctan2(
+        numpy.sin(dlon)*numpy.cos(lat2),
+        numpy.cos(lat1)*numpy.sin(lat2) -
+        numpy.sin(lat1)*numpy.cos(lat2)*numpy.cos(dlon))) % 360.
+    return delta, azimuth
 
 
 def originTimeSeparation(origin1, origin2):
-    dt = float(origin2.time().value() - origin1.time().value())
+    dt = originCoordinates(origin2)[3] - originCoordinates(origin1)[3]
     return abs(dt)
 
 
@@ -248,46 +352,26 @@ def compareOrigins(a, b):
 
     Returns either 0 (no improvement) or 1 (improvement)
     """
-    pick_ids_a = list()
-    pick_ids_b = list()
+    pick_ids_a = originPickIDs(a)
+    pick_ids_b = originPickIDs(b)
 
-    for i in range(a.arrivalCount()):
-        arr = a.arrival(i)
-        pick_ids_a.append(arr.pickID())
-    for i in range(b.arrivalCount()):
-        arr = b.arrival(i)
-        pick_ids_b.append(arr.pickID())
-
-    pick_ids_a.sort()
-    pick_ids_b.sort()
     if pick_ids_a == pick_ids_b:
         return 0
 
-    common_pick_count = 0
-    for pick_id in pick_ids_a:
-        if pick_id in pick_ids_b:
-            common_pick_count += 1
-    if not common_pick_count:
+    if pick_ids_a.isdisjoint(pick_ids_b):
         return -1
 
-    if common_pick_count == len(pick_ids_a):
-        if len(pick_ids_b) > len(pick_ids_a):
-            return 1
-        else:
-            return 0
-
-    if len(pick_ids_b) > len(pick_ids_a):
-        return 1
-    if len(pick_ids_b) < len(pick_ids_a):
-        return -1
+    # More picks is an improvement, fewer picks is not. This includes
+    # b being a superset of a.
+    count_a, count_b = len(pick_ids_a), len(pick_ids_b)
+    if count_b != count_a:
+        return 1 if count_b > count_a else -1
 
     seiscomp.logging.warning("Same number of picks but not same picks")
-    for pick_id in pick_ids_a:
-        if pick_id not in pick_ids_b:
-            seiscomp.logging.warning("Pick in A not B: " + pick_id)
-    for pick_id in pick_ids_b:
-        if pick_id not in pick_ids_a:
-            seiscomp.logging.warning("Pick in B not A: " + pick_id)
+    for pick_id in sorted(pick_ids_a - pick_ids_b):
+        seiscomp.logging.warning("Pick in A not B: " + pick_id)
+    for pick_id in sorted(pick_ids_b - pick_ids_a):
+        seiscomp.logging.warning("Pick in B not A: " + pick_id)
     return -1
 
 
@@ -331,37 +415,6 @@ def readInventoryFromXML(xml):
     return inventory
 
 
-def filterObjects(objects, authorWhitelist=None, agencyWhitelist=None):
-
-    def inrange(obj):
-        try:
-            c = obj.creationInfo()
-        except ValueError:
-            return False
-    
-        if authorWhitelist is not None and c.author() not in authorWhitelist:
-            return False
-
-        if agencyWhitelist is not None and c.agencyID() not in agencyWhitelist:
-            return False
-
-        return True
-
-    def inrange_dict(item):
-        key, obj = item
-        return inrange(obj)
-
-    def inrange_list(item):
-        return inrange(item)
-
-    if isinstance(objects, dict):
-        filtered = filter(inrange_dict, objects.items())
-    else:
-        filtered = filter(inrange_list, objects)
-
-    return type(objects)(filtered)
-
-
 def loadPicksForTimespan(
     query, startTime, endTime, authors=None):
     """
@@ -375,15 +428,31 @@ def loadPicksForTimespan(
     if authors:
         seiscomp.logging.debug("using author whitelist: " + str(", ".join(authors)))
 
+    if authors is not None:
+        authors = frozenset(authors)
+
     objects = dict()
+    count = 0
 
+    # Filter while loading, so that rejected picks are never collected
+    cast = seiscomp.datamodel.Pick.Cast
     for obj in query.getPicks(startTime, endTime):
-        pick = seiscomp.datamodel.Pick.Cast(obj)
-        if pick:
-            objects[pick.publicID()] = pick
+        pick = cast(obj)
+        if not pick:
+            continue
+        count += 1
+        # Picks without creation info are never used, with or without
+        # author whitelist
+        try:
+            author = pick.creationInfo().author()
+        except ValueError:
+            continue
+        if authors is not None and author not in authors:
+            continue
+        objects[pick.publicID()] = pick
 
-    seiscomp.logging.debug("Loaded %d picks from database" % len(objects))
-    objects = filterObjects(objects, authorWhitelist=authors)
+    seiscomp.logging.debug("Loaded %d picks from database, kept %d" % (
+        count, len(objects)))
 
     return objects.values()
 
@@ -392,8 +461,9 @@ def EventParametersPicks(ep):
     """
     Iterate over the picks in the EventParameters instance ep
     """
+    cast = seiscomp.datamodel.Pick.Cast
     for i in range(ep.pickCount()):
-        obj = seiscomp.datamodel.Pick.Cast(ep.pick(i))
+        obj = cast(ep.pick(i))
         if obj:
             yield obj
 
@@ -431,16 +501,24 @@ def InventoryIterator(inventory, time=None):
                     yield network, station, location, stream
 
 
-def PublicObjectCast(obj):
-    for tp in [
+# Cast functions of the public object types handled by
+# PublicObjectCast(), by class name
+publicObjectCasts = {
+    tp.__name__: tp.Cast for tp in [
         seiscomp.datamodel.Amplitude,
         seiscomp.datamodel.Pick,
         seiscomp.datamodel.Magnitude,
         seiscomp.datamodel.Origin,
         seiscomp.datamodel.FocalMechanism,
         seiscomp.datamodel.Event
-        ]:
-        typedObject = tp.Cast(obj)
+        ]
+}
+
+
+def PublicObjectCast(obj):
+    cast = publicObjectCasts.get(obj.className())
+    if cast is not None:
+        typedObject = cast(obj)
         if typedObject:
             return typedObject
     return obj
@@ -15,6 +15,7 @@
 
 import scocto.util
 import fnmatch
+import re
 
 class StreamWhitelist(list):
     """
@@ -57,21 +58,28 @@ class StreamWhitelist(list):
         return StreamWhitelist(text=text)
 
     def __init__(self, text=None, filename=None):
+        self._regex = None
+        self._results = dict()
         if text:
             self.parse(text)
         elif filename:
-            text = open(filename).read().strip()
-            self.parse(text)
+            with open(filename) as f:
+                self.parse(f)
 
     def parse(self, text):
+        """
+        Parse the whitelist from a text or from an iterable of lines,
+        like an open file.
+        """
+        if isinstance(text, str):
+            text = text.splitlines()
         self.clear()
         items = list()
-        for line in text.strip().split("\n"):
+        for line in text:
             line = line.strip()
             if not line or line.startswith("#"): 
                 continue
-            for item in line.split():
-                items.append(item)
+            items.extend(line.split())
         for item in items:
             item = [ t.strip() for t in item.split(".") ]
             item.extend(["*", "*", "*"])
@@ -79,13 +87,72 @@ class StreamWhitelist(list):
             if item[-2] == "":
                 item[-2] = "--"
             self.append(".".join(item))
-        pass
+        self.compile()
+
+    def compile(self):
+        """
+        Combine all items into a single regular expression, so that a
+        stream ID is matched against the entire whitelist in one step.
+
+        Called by parse(). If the list is modified otherwise, compile()
+        must be called again before the next matches().
+        """
+        if self:
+            self._regex = re.compile(
+                "|".join(fnmatch.translate(glob) for glob in self))
+        else:
+            self._regex = None
+        self._results.clear()
 
     def matches(self, stream_id):
-        n, s, l, c = scocto.util.nslc(stream_id)
+        if self._regex is None:
+            return False
+        nslc = scocto.util.nslc(stream_id)
+        # The number of distinct streams is limited, so we remember the
+        # result for each and only need the regex once per stream.
+        try:
+            return self._results[nslc]
+        except KeyError:
+            pass
+        n, s, l, c = nslc
         if l == "":
             l = "--"
         stream_id = "%s.%s.%s.%s" % (n, s, l, c)
-        for glob in self:
-            if fnmatch.fnmatchcase(stream_id, glob):
+        result = self._results[nslc] = self._regex.match(stream_id) is not None
+        return result
+
+
+class AuthorWhitelist:
+    """
+    Whitelist of object authors, e.g. pick authors. An item may
+    contain the wildcards supported by fnmatch, like in
+
+        scautopick*
+
+    Plain author names are looked up in a set, only authors not
+    found there are matched against the wildcard patterns.
+    """
+
+    def __init__(self, authors=()):
+        authors = list(authors)
+        self.names = frozenset(a for a in authors if not isPattern(a))
+        self.patterns = [
+            re.compile(fnmatch.translate(a)) for a in authors if isPattern(a)]
+
+    def __bool__(self):
+        return bool(self.names or self.patterns)
+
+    def matches(self, author):
+        if author in self.names:
+            return True
+        for pattern in self.patterns:
+            if pattern.match(author):
                 return True
+        return False
+
+
+def isPattern(item):
+    """
+    True if item contains any fnmatch wildcard
+    """
+    return any(c in item for c in "*?[")
@@ -0,0 +1,114 @@
+import types
+import seiscomp.core
+import seiscomp.datamodel
+from scocto.app import App, PickBuffer, MyEvent, MyEventList
+from scocto.util import pickEpoch
+
+seiscomp.datamodel.PublicObject.SetRegistrationEnabled(False)
+
+def makeTime(t):
+    return seiscomp.core.Time(int(t), int(round((t - int(t))*1.e6)))
+
+def makePick(public_id, t, sta="STA"):
+    pick = seiscomp.datamodel.Pick(public_id)
+    pick.setTime(seiscomp.datamodel.TimeQuantity(makeTime(t)))
+    pick.setWaveformID(
+        seiscomp.datamodel.WaveformStreamID("GE", sta, "", "BHZ", ""))
+    return pick
+
+def makeOrigin(public_id, lat, lon, dep, t, pick_ids, method="PyOcto"):
+    origin = seiscomp.datamodel.Origin(public_id)
+    origin.setLatitude(seiscomp.datamodel.RealQuantity(lat))
+    origin.setLongitude(seiscomp.datamodel.RealQuantity(lon))
+    origin.setDepth(seiscomp.datamodel.RealQuantity(dep))
+    origin.setTime(seiscomp.datamodel.TimeQuantity(makeTime(t)))
+    origin.setMethodID(method)
+    for pick_id in pick_ids:
+        arrival = seiscomp.datamodel.Arrival()
+        arrival.setPickID(pick_id)
+        arrival.setPhase(seiscomp.datamodel.Phase("P"))
+        origin.add(arrival)
+    return origin
+
+def test_pick_buffer():
+    buf = PickBuffer(capacity=2)
+    for i, t in enumerate([30, 10, 20, 10, 40]):
+        buf.insert(makePick("p%d" % i, t, sta="S%d" % i))
+    assert len(buf) == 5
+    assert list(buf.times[:5]) == [10, 10, 20, 30, 40]
+    # picks with equal times are kept in the order of insertion
+    assert [p.publicID() for p in buf.picks] == ["p1", "p3", "p2", "p0", "p4"]
+    assert buf.stations == ["GE.S1.", "GE.S3.", "GE.S2.", "GE.S0.", "GE.S4."]
+
+    # window boundaries are exclusive
+    assert buf.window(10, 30) == (2, 3)
+    assert buf.window(5, 45) == (0, 5)
+    assert buf.window(41, 50) == (5, 5)
+
+    removed = buf.removeOlderThan(20)
+    assert [p.publicID() for p in removed] == ["p1", "p3"]
+    assert len(buf) == 3
+    assert list(buf.times[:3]) == [20, 30, 40]
+    assert buf.stations == ["GE.S2.", "GE.S0.", "GE.S4."]
+    assert buf.removeOlderThan(0) == []
+
+def test_find_matching_event():
+    events = MyEventList()
+    picks = { "p%d" % i: None for i in range(10) }
+
+    a, b = MyEvent(), MyEvent()
+    events.append_event(a)
+    events.set_origin(a, makeOrigin("a", 0, 0, 10, 1000, ["p1", "p2", "p3"]), picks)
+    events.append_event(b)
+    events.set_origin(b, makeOrigin("b", 0, 0.5, 10, 1005, ["p4", "p5", "p6"]), picks)
+
+    origin = makeOrigin("o1", 0.1, 0, 10, 1001, ["p1", "p2", "p7"])
+    assert events.find_matching_event(origin) is a
+
+    # the event with most picks in common wins
+    origin = makeOrigin("o2", 0, 0.2, 10, 1002, ["p3", "p4", "p5"])
+    assert events.find_matching_event(origin) is b
+
+    # too far away in space or time, no picks in common, other method
+    origin = makeOrigin("o3", 10, 0, 10, 1000, ["p1", "p2"])
+    assert events.find_matching_event(origin) is None
+    origin = makeOrigin("o4", 0, 0, 10, 1100, ["p1", "p2"])
+    assert events.find_matching_event(origin) is None
+    origin = makeOrigin("o5", 0, 0, 10, 1000, ["p8", "p9"])
+    assert events.find_matching_event(origin) is None
+    origin = makeOrigin("o6", 0, 0, 10, 1000, ["p1", "p2"], method="LOCSAT")
+    assert events.find_matching_event(origin) is None
+
+    # a newer origin of an event replaces the coordinates of its table row
+    events.set_origin(a, makeOrigin("a2", 5, 5, 10, 1010, ["p1", "p2", "p3"]), picks)
+    origin = makeOrigin("o7", 0.1, 0, 10, 1001, ["p1", "p2"])
+    assert events.find_matching_event(origin) is None
+    origin = makeOrigin("o8", 5, 5, 10, 1010, ["p1", "p2"])
+    assert events.find_matching_event(origin) is a
+
+def test_find_matching_event_many():
+    # more events than the initial capacity of the tables
+    events = MyEventList()
+    picks = { "p%d" % i: None for i in range(100) }
+    for i in range(100):
+        event = MyEvent()
+        events.append_event(event)
+        events.set_origin(event, makeOrigin("e%d" % i, 0, i, 10, 1000, ["p%d" % i]), picks)
+    assert len(events) == 100
+    for i in (0, 63, 64, 99):
+        origin = makeOrigin("o%d" % i, 0, i, 10, 1000, ["p%d" % i])
+        assert events.find_matching_event(origin) is events.events[i]
+
+def test_pick_batches():
+    app = types.SimpleNamespace(pickBatchSpan=1.)
+    picks = [ makePick("p%g" % t, t) for t in (3, 0, 0.5, 1.2, 5, 5.5) ]
+    batches = list(App.pickBatches(app, picks))
+    times = [ [ pickEpoch(pick) for pick in batch ] for batch in batches ]
+    assert times == [[0, 0.5], [1.2], [3], [5, 5.5]]
+    assert list(App.pickBatches(app, [])) == []
+
+if __name__ == "__main__":
+    test_pick_buffer()
+    test_find_matching_event()
+    test_find_matching_event_many()
+    test_pick_batches()
@@ -0,0 +1,81 @@
+import numpy
+from scocto.util import haversineKm, deltaAzimuth, compareOrigins, \
+    computeAzimuthalGaps, sumOfLargestGaps
+
+def test_haversine_km():
+    assert abs(haversineKm(0, 0, 1, 0) - 111.195) < 0.001
+    assert abs(haversineKm(0, 0, 0, 1) - 111.195) < 0.001
+    assert haversineKm(10, 20, 10, 20) == 0
+
+def test_haversine_km_vectorized():
+    lats = numpy.array([0., 1., 0.])
+    lons = numpy.array([0., 0., 2.])
+    dist = haversineKm(0, 0, lats, lons)
+    assert dist.shape == (3,)
+    assert numpy.allclose(dist, [0, 111.195, 2*111.195], atol=0.01)
+
+def test_delta_azimuth():
+    delta, azimuth = deltaAzimuth(0, 0, 1, 0)
+    assert abs(delta - 1) < 1.e-9 and abs(azimuth) < 1.e-9
+    delta, azimuth = deltaAzimuth(0, 0, 0, -2)
+    assert abs(delta - 2) < 1.e-9 and abs(azimuth - 270) < 1.e-9
+    delta, azimuth = deltaAzimuth(0, 0, numpy.array([1., 0.]), numpy.array([0., 1.]))
+    assert numpy.allclose(delta, [1, 1])
+    assert numpy.allclose(azimuth, [0, 90])
+
+class FakeArrival:
+    def __init__(self, pick_id="", azimuth=0., distance=10., weight=1.):
+        self._pickID = pick_id
+        self._azimuth, self._distance, self._weight = azimuth, distance, weight
+    def pickID(self):
+        return self._pickID
+    def azimuth(self):
+        return self._azimuth
+    def distance(self):
+        return self._distance
+    def weight(self):
+        return self._weight
+
+class FakeOrigin:
+    def __init__(self, arrivals):
+        self.arrivals = list(arrivals)
+    def arrivalCount(self):
+        return len(self.arrivals)
+    def arrival(self, i):
+        return self.arrivals[i]
+
+def originWithPicks(pick_ids):
+    return FakeOrigin(FakeArrival(pick_id) for pick_id in pick_ids)
+
+def test_compare_origins():
+    a = originWithPicks(["p1", "p2", "p3"])
+    assert compareOrigins(a, originWithPicks(["p3", "p2", "p1"])) == 0
+    assert compareOrigins(a, originWithPicks(["p1", "p2"])) == -1
+    assert compareOrigins(a, originWithPicks(["p1", "p2", "p3", "p4"])) == 1
+    assert compareOrigins(a, originWithPicks(["p1", "p4", "p5", "p6"])) == 1
+    assert compareOrigins(a, originWithPicks(["p1", "p2", "p4"])) == -1
+    assert compareOrigins(a, originWithPicks(["p4", "p5"])) == -1
+
+def test_compute_azimuthal_gaps():
+    arrivals = [ FakeArrival(azimuth=a) for a in (10, 100, -90, 370, 180) ]
+    arrivals.append(FakeArrival(azimuth=45, weight=0))
+    arrivals.append(FakeArrival(azimuth=45, distance=150))
+    # distinct azimuths 10, 100, 180, 270 -> gaps 90, 80, 90, 100
+    gap, sgap, tgap = computeAzimuthalGaps(FakeOrigin(arrivals), maxDelta=120)
+    assert (gap, sgap, tgap) == (100, 190, 190)
+    single = FakeOrigin([FakeArrival(azimuth=10)])
+    assert computeAzimuthalGaps(single) == (360, 360, 360)
+
+def test_sum_of_largest_gaps():
+    assert sumOfLargestGaps([10]) == 360
+    assert sumOfLargestGaps([270, 10, 100, 180]) == 190
+    assert sumOfLargestGaps([270, 10, 100, 180], n=1) == 100
+    assert sumOfLargestGaps([0, 90], n=3) == 360
+
+if __name__ == "__main__":
+    test_haversine_km()
+    test_haversine_km_vectorized()
+    test_delta_azimuth()
+    test_compare_origins()
+    test_compute_azimuthal_gaps()
+    test_sum_of_largest_gaps()
@@ -1,4 +1,5 @@
-from scocto.whitelist import StreamWhitelist
+import seiscomp.datamodel
+from scocto.whitelist import StreamWhitelist, AuthorWhitelist
 
 def test_from_text():
     whitelist = StreamWhitelist.FromText("C C1 CX\n# comment\nGT.LPAZ\n")
@@ -12,6 +13,48 @@ def test_from_file():
     whitelist = StreamWhitelist.FromFile(filename)
     assert whitelist == ['C.*.*.*', 'C1.*.*.*', 'CX.*.*.*', 'GT.LPAZ.*.*']
 
+def streamID(n, s, l, c):
+    return seiscomp.datamodel.WaveformStreamID(n, s, l, c, "")
+
+def test_matches():
+    whitelist = StreamWhitelist.FromText("GE IU.ANMO.00\nCX.PB01.--\nII.*.*.BH?")
+    assert whitelist.matches(streamID("GE", "STU", "", "BHZ"))
+    assert whitelist.matches(streamID("IU", "ANMO", "00", "BHZ"))
+    assert not whitelist.matches(streamID("IU", "ANMO", "10", "BHZ"))
+    assert whitelist.matches(streamID("CX", "PB01", "", "HHZ"))
+    assert not whitelist.matches(streamID("CX", "PB01", "00", "HHZ"))
+    assert whitelist.matches(streamID("II", "BFO", "00", "BHN"))
+    assert not whitelist.matches(streamID("II", "BFO", "00", "LHZ"))
+    # remembered results
+    assert whitelist.matches(streamID("GE", "STU", "", "BHZ"))
+    assert not whitelist.matches(streamID("IU", "ANMO", "10", "BHZ"))
+
+    # parsing again replaces both the regex and the remembered results
+    whitelist.parse("IU")
+    assert whitelist.matches(streamID("IU", "ANMO", "10", "BHZ"))
+    assert not whitelist.matches(streamID("GE", "STU", "", "BHZ"))
+
+    # after other modifications compile() has to be called
+    whitelist.append("GE.*.*.*")
+    whitelist.compile()
+    assert whitelist.matches(streamID("GE", "STU", "", "BHZ"))
+    whitelist.clear()
+    whitelist.compile()
+    assert not whitelist.matches(streamID("IU", "ANMO", "00", "BHZ"))
+
+    assert not StreamWhitelist().matches(streamID("GE", "STU", "", "BHZ"))
+
+def test_author_whitelist():
+    whitelist = AuthorWhitelist(["dlpicker", "scautopick*"])
+    assert whitelist.matches("dlpicker")
+    assert whitelist.matches("scautopick")
+    assert whitelist.matches("scautopick@host")
+    assert not whitelist.matches("dlpicker2")
+    assert not whitelist.matches("scamp")
+    assert not AuthorWhitelist([])
+
 if __name__ == "__main__":
     test_from_text()
     test_from_file()
+    test_matches()
+    test_author_whitelist()